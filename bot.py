@@ -1,21 +1,42 @@
+import asyncio
+import datetime
 import os
 import logging
-import requests
-import schedule
+import queue
+import random
+import aiohttp
+import orjson
+import redis.asyncio as redis
 import time
+from collections import deque
+from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from telegram import Update
-from telegram.ext import Updater, CommandHandler, MessageHandler, filters, CallbackContext
-from flask import Flask
-from threading import Thread
+from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, PersistenceInput, PicklePersistence, filters
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
 from urllib.parse import quote
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                    level=logging.INFO)
+# Configure logging; records are queued and written by a background thread
+# so log I/O never blocks the event loop. Only the listener's StreamHandler
+# formats records — a formatter on the QueueHandler itself would be baked
+# into the record before enqueueing and applied twice.
+_log_queue = queue.Queue(-1)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+QueueListener(_log_queue, _stream_handler).start()
 logger = logging.getLogger(__name__)
 
 # Telegram Bot Token, Group ID, Channel Link from .env
@@ -23,261 +44,405 @@ TOKEN = os.getenv("TELEGRAM_TOKEN")
 GROUP_ID = os.getenv("GROUP_ID")
 CHANNEL_LINK = os.getenv("CHANNEL_LINK")
 
-# Initialize personal finance data
-finance_data = {"income": 0, "expenses": 0}
-
-# Initialize Flask app for Render deployment
-app = Flask(__name__)
+# Pre-built gate messages so they are not re-formatted on every denied call
+JOIN_MSG = f"Please join the channel first: {CHANNEL_LINK}"
+SLOW_DOWN_MSG = "You're sending commands too fast. Please wait a moment."
+WELCOME_MSG = "Welcome to Super Bot! Choose a feature: /quiz, /finance, /study, /weather, /music, /fitness, /language, /confession"
+
+# API keys and server port from .env, cached once at import time
+WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
+LASTFM_API_KEY = os.getenv("LASTFM_API_KEY")
+PORT = int(os.getenv("PORT", 5000))
+
+# Public base URL for the Telegram webhook (Render exposes its own);
+# without one the bot falls back to polling for local development
+PUBLIC_URL = os.getenv("PUBLIC_URL") or os.getenv("RENDER_EXTERNAL_URL")
+
+# Redis client for per-user state shared across processes and restarts;
+# the connection is established lazily on first command
+REDIS = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+
+# TTL caches for upstream API responses (per-endpoint expiry policies)
+WEATHER_CACHE = TTLCache(maxsize=1024, ttl=600)       # weather changes quickly
+MUSIC_CACHE = TTLCache(maxsize=1024, ttl=3600)        # top tracks move slowly
+WORD_CACHE = TTLCache(maxsize=64, ttl=86400)          # one word per day
+
+# Pre-fetched trivia questions so each /quiz is served from memory; the buffer
+# is topped up in the background once it drops below the watermark
+QUIZ_BUFFER = deque()
+QUIZ_BATCH_URL = "https://opentdb.com/api.php?amount=50&type=multiple"
+QUIZ_LOW_WATERMARK = 10
+_quiz_refill_task = None
+
+# Channel-membership cache: user_id -> (is_member, expires_at). Expired entries
+# are kept so the last known value can be served if the Telegram API call
+# fails, and the least recently refreshed users are evicted past the bound.
+MEMBER_CACHE = {}
+MEMBER_CACHE_MAX = 10_000
+MEMBER_TTL_OK = 300       # confirmed members rarely leave; re-check every 5 min
+MEMBER_TTL_DENIED = 30    # non-members may join at any moment; re-check quickly
+
+# Token buckets for per-user rate limiting: user_id -> (tokens, last_refill).
+# A bucket idle for burst/rate seconds has refilled completely, so expired
+# entries are equivalent to fresh buckets and can be dropped.
+RATE_LIMIT_RATE = 1.0     # tokens replenished per second
+RATE_LIMIT_BURST = 5.0    # short bursts allowed before throttling
+BUCKETS = TTLCache(maxsize=10_000, ttl=RATE_LIMIT_BURST / RATE_LIMIT_RATE)
+
+
+# Lifecycle hooks for the shared aiohttp session (created on the event loop)
+async def post_init(application: Application):
+    """Create the shared HTTP session once the event loop is running."""
+    application.bot_data["http"] = aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=5))
+
+async def post_shutdown(application: Application):
+    """Close the shared HTTP session on shutdown."""
+    await application.bot_data["http"].close()
 
 # Helper function to send messages to the group
-def send_confession_to_group(confession: str):
+async def send_confession_to_group(bot, confession: str):
     """Send anonymous confession to the Telegram group."""
-    updater = Updater(TOKEN, use_context=True)
-    chat_id = GROUP_ID
-    updater.bot.send_message(chat_id=chat_id, text=confession)
+    await bot.send_message(chat_id=GROUP_ID, text=confession)
 
 # Helper function to check if user joined the channel
-def check_channel_member(update: Update) -> bool:
+async def check_channel_member(update: Update) -> bool:
     """Check if the user has joined the channel."""
+    user_id = update.message.from_user.id
+    cached = MEMBER_CACHE.get(user_id)
+    if cached is not None and time.monotonic() < cached[1]:
+        return cached[0]
     try:
-        user_id = update.message.from_user.id
-        member = update.bot.get_chat_member(CHANNEL_LINK, user_id)
-        return member.status in ['member', 'administrator', 'creator']
+        member = await update.get_bot().get_chat_member(CHANNEL_LINK, user_id)
+        is_member = member.status in ['member', 'administrator', 'creator']
     except Exception as e:
         logger.error(f"Error checking channel membership: {e}")
+        # Serve the last known value rather than locking the user out
+        return cached[0] if cached is not None else False
+    ttl = MEMBER_TTL_OK if is_member else MEMBER_TTL_DENIED
+    # Re-insert so dict order tracks refresh recency, then evict the stalest
+    MEMBER_CACHE.pop(user_id, None)
+    MEMBER_CACHE[user_id] = (is_member, time.monotonic() + ttl)
+    while len(MEMBER_CACHE) > MEMBER_CACHE_MAX:
+        MEMBER_CACHE.pop(next(iter(MEMBER_CACHE)))
+    return is_member
+
+def allow(user_id: int, rate: float = RATE_LIMIT_RATE, burst: float = RATE_LIMIT_BURST) -> bool:
+    """Token-bucket check; False means the user is over quota."""
+    now = time.monotonic()
+    tokens, last = BUCKETS.get(user_id, (burst, now))
+    tokens = min(burst, tokens + (now - last) * rate)
+    if tokens < 1:
+        BUCKETS[user_id] = (tokens, now)
         return False
+    BUCKETS[user_id] = (tokens - 1, now)
+    return True
+
+def require_channel(fn):
+    """Decorator gating a handler on rate limit and channel membership."""
+    @wraps(fn)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not allow(update.message.from_user.id):
+            await update.message.reply_text(SLOW_DOWN_MSG)
+            return
+        if not await check_channel_member(update):
+            await update.message.reply_text(JOIN_MSG)
+            return
+        return await fn(update, context)
+    return wrapper
 
 # Command Handlers
 
-def start(update: Update, context: CallbackContext):
+@require_channel
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start command."""
-    if not check_channel_member(update):
-        update.message.reply_text(f"Please join the channel first: {CHANNEL_LINK}")
-        return
+    await update.message.reply_text(WELCOME_MSG)
 
-    update.message.reply_text("Welcome to Super Bot! Choose a feature: /quiz, /finance, /study, /weather, /music, /fitness, /language, /confession")
-
-def confession(update: Update, context: CallbackContext):
+@require_channel
+async def confession(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Receive anonymous confession and send it to the group."""
-    if not check_channel_member(update):
-        update.message.reply_text(f"Please join the channel first: {CHANNEL_LINK}")
-        return
-
     confession_text = " ".join(context.args)
-    
+
     if confession_text:
-        send_confession_to_group(confession_text)
-        update.message.reply_text("Your confession has been sent anonymously!")
+        await send_confession_to_group(context.bot, confession_text)
+        await update.message.reply_text("Your confession has been sent anonymously!")
     else:
-        update.message.reply_text("Please provide a confession after the command.")
+        await update.message.reply_text("Please provide a confession after the command.")
 
 # Trivia/Quiz Command Handler
-def quiz(update: Update, context: CallbackContext):
+async def _refill_quiz(http: aiohttp.ClientSession):
+    """Top up the trivia buffer with a fresh batch of questions."""
+    global _quiz_refill_task
+    try:
+        async with http.get(QUIZ_BATCH_URL) as response:
+            question_data = await response.json(loads=orjson.loads)
+        QUIZ_BUFFER.extend(question_data["results"])
+    finally:
+        _quiz_refill_task = None
+
+@require_channel
+async def quiz(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Trivia/Quiz using Open Trivia Database API."""
-    if not check_channel_member(update):
-        update.message.reply_text(f"Please join the channel first: {CHANNEL_LINK}")
-        return
-
-    url = "https://opentdb.com/api.php?amount=1&type=multiple"
-    response = requests.get(url)
-    question_data = response.json()
-    question = question_data["results"][0]
+    global _quiz_refill_task
+    if len(QUIZ_BUFFER) < QUIZ_LOW_WATERMARK and _quiz_refill_task is None:
+        _quiz_refill_task = asyncio.create_task(_refill_quiz(context.bot_data["http"]))
+    if not QUIZ_BUFFER:
+        # Buffer ran dry; this user waits for the batch already in flight
+        await _quiz_refill_task
+    question = QUIZ_BUFFER.popleft()
     question_text = question["question"]
     options = question["incorrect_answers"] + [question["correct_answer"]]
     correct_answer = question["correct_answer"]
 
     # Shuffle options to randomize the answers
-    import random
     random.shuffle(options)
 
     # Send question and options to user
-    update.message.reply_text(f"Question: {question_text}\nOptions: {', '.join(options)}")
+    await update.message.reply_text(f"Question: {question_text}\nOptions: {', '.join(options)}")
 
-    # Store correct answer for the next step
+    # Store correct answer for the next step, pre-lowercased for the comparison
     context.user_data["correct_answer"] = correct_answer
+    context.user_data["correct_answer_lc"] = correct_answer.lower()
 
-def check_answer(update: Update, context: CallbackContext):
+async def check_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Check if the user's answer is correct."""
-    user_answer = update.message.text
-    correct_answer = context.user_data.get("correct_answer")
+    answer_lc = context.user_data.pop("correct_answer_lc", None)
+    if answer_lc is None:
+        # No quiz pending for this user; ignore ordinary chat messages
+        return
+    correct_answer = context.user_data.pop("correct_answer", None)
 
-    if user_answer.lower() == correct_answer.lower():
-        update.message.reply_text("Correct!")
+    if update.message.text.lower() == answer_lc:
+        await update.message.reply_text("Correct!")
     else:
-        update.message.reply_text(f"Incorrect! The correct answer was: {correct_answer}")
+        await update.message.reply_text(f"Incorrect! The correct answer was: {correct_answer}")
 
 # Personal Finance Command Handlers
-def finance(update: Update, context: CallbackContext):
+@require_channel
+async def finance(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Log income and expenses."""
-    if not check_channel_member(update):
-        update.message.reply_text(f"Please join the channel first: {CHANNEL_LINK}")
-        return
+    key = f"fin:{update.message.from_user.id}"
+    args = context.args
+    sub = args[0].lower() if args else ""
 
-    command = " ".join(context.args).lower()
-    
-    if command.startswith("income"):
+    if sub == "income":
         try:
-            amount = float(command.split(" ")[1])
-            finance_data["income"] += amount
-            update.message.reply_text(f"Income of {amount} added. Total income: {finance_data['income']}")
+            amount = float(args[1])
+            total = await REDIS.hincrbyfloat(key, "income", amount)
+            await update.message.reply_text(f"Income of {amount} added. Total income: {total}")
         except (ValueError, IndexError):
-            update.message.reply_text("Please provide a valid income amount.")
-    
-    elif command.startswith("expense"):
+            await update.message.reply_text("Please provide a valid income amount.")
+
+    elif sub == "expense":
         try:
-            amount = float(command.split(" ")[1])
-            finance_data["expenses"] += amount
-            update.message.reply_text(f"Expense of {amount} added. Total expenses: {finance_data['expenses']}")
+            amount = float(args[1])
+            total = await REDIS.hincrbyfloat(key, "expenses", amount)
+            await update.message.reply_text(f"Expense of {amount} added. Total expenses: {total}")
         except (ValueError, IndexError):
-            update.message.reply_text("Please provide a valid expense amount.")
-    
-    elif command == "balance":
-        balance = finance_data["income"] - finance_data["expenses"]
-        update.message.reply_text(f"Your balance is: {balance}")
-    
+            await update.message.reply_text("Please provide a valid expense amount.")
+
+    elif sub == "balance":
+        income, expenses = await REDIS.hmget(key, "income", "expenses")
+        balance = float(income or 0) - float(expenses or 0)
+        await update.message.reply_text(f"Your balance is: {balance}")
+
     else:
-        update.message.reply_text("Use /finance income <amount>, /finance expense <amount>, or /finance balance.")
+        await update.message.reply_text("Use /finance income <amount>, /finance expense <amount>, or /finance balance.")
 
 # Study Companion Command Handler (Pomodoro Timer)
-def study(update: Update, context: CallbackContext):
+async def _pomodoro_work_over(context: ContextTypes.DEFAULT_TYPE):
+    """Job callback: end of a 25-minute work session."""
+    await context.bot.send_message(chat_id=context.job.chat_id, text="Work session is over. Take a 5-minute break!")
+
+async def _pomodoro_break_over(context: ContextTypes.DEFAULT_TYPE):
+    """Job callback: end of a 5-minute break."""
+    await context.bot.send_message(chat_id=context.job.chat_id, text="Break time is over. Time to work!")
+
+@require_channel
+async def study(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start a Pomodoro timer (25 minutes work, 5 minutes break)."""
-    if not check_channel_member(update):
-        update.message.reply_text(f"Please join the channel first: {CHANNEL_LINK}")
-        return
+    chat_id = update.effective_chat.id
+    job_name = f"pomo-{chat_id}"
 
-    schedule.every(25).minutes.do(lambda: update.message.reply_text("Work session is over. Take a 5-minute break!"))
-    schedule.every(5).minutes.do(lambda: update.message.reply_text("Break time is over. Time to work!"))
+    # Remove timers from a previous /study in this chat to avoid duplicate reminders
+    for job in context.job_queue.get_jobs_by_name(job_name):
+        job.schedule_removal()
 
-    update.message.reply_text("Pomodoro timer started! Work for 25 minutes, then take a 5-minute break.")
+    # A full cycle is 30 minutes: work ends at minute 25, break ends at minute 30
+    context.job_queue.run_repeating(_pomodoro_work_over, interval=30 * 60, first=25 * 60,
+                                    chat_id=chat_id, name=job_name)
+    context.job_queue.run_repeating(_pomodoro_break_over, interval=30 * 60, first=30 * 60,
+                                    chat_id=chat_id, name=job_name)
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    await update.message.reply_text("Pomodoro timer started! Work for 25 minutes, then take a 5-minute break.")
 
 # Weather Command Handler (OpenWeatherMap API)
-def weather(update: Update, context: CallbackContext):
+@require_channel
+async def weather(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Get the current weather using OpenWeatherMap API."""
-    if not check_channel_member(update):
-        update.message.reply_text(f"Please join the channel first: {CHANNEL_LINK}")
-        return
-
     city = " ".join(context.args)
     if not city:
-        update.message.reply_text("Please provide a city name.")
+        await update.message.reply_text("Please provide a city name.")
         return
 
-    api_key = os.getenv("WEATHER_API_KEY")
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-    response = requests.get(url)
-    weather_data = response.json()
+    cache_key = city.lower()
+    weather_data = WEATHER_CACHE.get(cache_key)
+    if weather_data is None:
+        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={WEATHER_API_KEY}&units=metric"
+        http = context.bot_data["http"]
+        async with http.get(url) as response:
+            weather_data = await response.json(loads=orjson.loads)
+        # Only cache successes; a transient upstream error must not be
+        # pinned for the whole TTL
+        if weather_data["cod"] == 200:
+            WEATHER_CACHE[cache_key] = weather_data
 
     if weather_data["cod"] == 200:
         main = weather_data["main"]
         weather_desc = weather_data["weather"][0]["description"]
         temperature = main["temp"]
-        update.message.reply_text(f"Weather in {city}:\n{weather_desc}\nTemperature: {temperature}°C")
+        await update.message.reply_text(f"Weather in {city}:\n{weather_desc}\nTemperature: {temperature}°C")
     else:
-        update.message.reply_text("City not found!")
+        await update.message.reply_text("City not found!")
 
 # Music Recommendations Command Handler (Last.fm API)
-def music(update: Update, context: CallbackContext):
+@require_channel
+async def music(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recommend music based on user mood or genre."""
-    if not check_channel_member(update):
-        update.message.reply_text(f"Please join the channel first: {CHANNEL_LINK}")
-        return
-
     genre = " ".join(context.args)
     if not genre:
-        update.message.reply_text("Please provide a genre (e.g., /music pop).")
+        await update.message.reply_text("Please provide a genre (e.g., /music pop).")
         return
 
-    api_key = os.getenv("LASTFM_API_KEY")
-    url = f"http://ws.audioscrobbler.com/2.0/?method=tag.gettoptracks&tag={genre}&api_key={api_key}&format=json"
-    response = requests.get(url)
-    music_data = response.json()
+    cache_key = genre.lower()
+    music_data = MUSIC_CACHE.get(cache_key)
+    if music_data is None:
+        url = f"http://ws.audioscrobbler.com/2.0/?method=tag.gettoptracks&tag={genre}&api_key={LASTFM_API_KEY}&format=json"
+        http = context.bot_data["http"]
+        async with http.get(url) as response:
+            music_data = await response.json(loads=orjson.loads)
+        # Only cache successes; a transient upstream error must not be
+        # pinned for the whole TTL
+        if "error" not in music_data:
+            MUSIC_CACHE[cache_key] = music_data
 
     if "error" in music_data:
-        update.message.reply_text("Could not find music for that genre.")
+        await update.message.reply_text("Could not find music for that genre.")
     else:
         track = music_data["tracks"]["track"][0]["name"]
         artist = music_data["tracks"]["track"][0]["artist"]["name"]
-        update.message.reply_text(f"Top {genre} track: {track} by {artist}")
+        await update.message.reply_text(f"Top {genre} track: {track} by {artist}")
 
 # Fitness Command Handler
-def fitness(update: Update, context: CallbackContext):
+@require_channel
+async def fitness(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Track workouts."""
-    if not check_channel_member(update):
-        update.message.reply_text(f"Please join the channel first: {CHANNEL_LINK}")
-        return
+    args = context.args
+    sub = args[0].lower() if args else ""
 
-    command = " ".join(context.args).lower()
-
-    if command.startswith("log"):
-        workout = " ".join(command.split(" ")[1:])
-        update.message.reply_text(f"Workout '{workout}' logged!")
+    if sub == "log":
+        workout = " ".join(args[1:])
+        await update.message.reply_text(f"Workout '{workout}' logged!")
     else:
-        update.message.reply_text("Use /fitness log <workout> to log a workout.")
+        await update.message.reply_text("Use /fitness log <workout> to log a workout.")
 
 # Language Learning Command Handler (Oxford API)
-def language(update: Update, context: CallbackContext):
+@require_channel
+async def language(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Learn a new word daily from an API."""
-    if not check_channel_member(update):
-        update.message.reply_text(f"Please join the channel first: {CHANNEL_LINK}")
-        return
+    word_of_the_day = await get_word_of_the_day(context.bot_data["http"])  # This should interact with an API like Oxford
+    await update.message.reply_text(f"Word of the Day: {word_of_the_day}")
 
-    word_of_the_day = get_word_of_the_day()  # This should interact with an API like Oxford
-    update.message.reply_text(f"Word of the Day: {word_of_the_day}")
+RANDOM_WORD_URL = "https://random-word-api.herokuapp.com/word"
+DICTIONARY_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
 
-def get_word_of_the_day():
-    """Fetch word of the day from an API."""
-    # Example with Oxford API, replace with a real API
-    url = "https://api.dictionaryapi.dev/api/v2/entries/en/<word>"
-    response = requests.get(url, headers={"app_id": "your_app_id", "app_key": "your_app_key"})
-    word_data = response.json()
-    return word_data["word"]
+async def get_word_of_the_day(http: aiohttp.ClientSession):
+    """Fetch word of the day from an API, memoized per calendar day."""
+    today = datetime.date.today()
+    word = WORD_CACHE.get(today)
+    if word is None:
+        try:
+            async with http.get(RANDOM_WORD_URL) as response:
+                candidate = (await response.json(loads=orjson.loads))[0]
+            async with http.get(DICTIONARY_URL.format(word=quote(candidate))) as response:
+                word_data = await response.json(loads=orjson.loads)
+            definition = word_data[0]["meanings"][0]["definitions"][0]["definition"]
+            word = f"{candidate} — {definition}"
+        except Exception as e:
+            logger.error(f"Error fetching word of the day: {e}")
+            return "No word available today, try again later."
+        WORD_CACHE[today] = word
+    return word
 
 # Error handling
-def error(update: Update, context: CallbackContext):
+async def error(update: object, context: ContextTypes.DEFAULT_TYPE):
     """Log errors caused by updates."""
     logger.warning(f'Update {update} caused error {context.error}')
 
-# Flask app setup for Render deployment
-@app.route("/")
-def home():
-    return "Super Bot is running!"
-
-# Main function to start the bot
-def main():
-    """Start the bot."""
-    updater = Updater(TOKEN, use_context=True)
+# ASGI health endpoint for Render deployment
+async def home(request):
+    return PlainTextResponse("Super Bot is running!")
+
+# Main function to start the bot and the health server on one event loop
+async def main():
+    """Run the bot and the health endpoint on a single asyncio event loop."""
+    # Persist user_data (in-flight quiz answers) across restarts and redeploys.
+    # bot_data is excluded: it holds the unpicklable aiohttp session, which
+    # would make every persistence run raise and kill the background task.
+    persistence = PicklePersistence(
+        filepath="bot_state.pkl",
+        store_data=PersistenceInput(bot_data=False, callback_data=False))
+    application = Application.builder().token(TOKEN).persistence(persistence).build()
 
     # Set up command handlers
-    updater.dispatcher.add_handler(CommandHandler("start", start))
-    updater.dispatcher.add_handler(CommandHandler("confession", confession))
-    updater.dispatcher.add_handler(CommandHandler("quiz", quiz))
-    updater.dispatcher.add_handler(CommandHandler("finance", finance))
-    updater.dispatcher.add_handler(CommandHandler("study", study))
-    updater.dispatcher.add_handler(CommandHandler("weather", weather))
-    updater.dispatcher.add_handler(CommandHandler("music", music))
-    updater.dispatcher.add_handler(CommandHandler("fitness", fitness))
-    updater.dispatcher.add_handler(CommandHandler("language", language))
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("confession", confession))
+    application.add_handler(CommandHandler("quiz", quiz))
+    application.add_handler(CommandHandler("finance", finance))
+    application.add_handler(CommandHandler("study", study))
+    application.add_handler(CommandHandler("weather", weather))
+    application.add_handler(CommandHandler("music", music))
+    application.add_handler(CommandHandler("fitness", fitness))
+    application.add_handler(CommandHandler("language", language))
 
     # Add message handler for user answers in the quiz
-    updater.dispatcher.add_handler(MessageHandler(filters.text & ~filters.command, check_answer))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, check_answer))
 
     # Add error handler
-    updater.dispatcher.add_error_handler(error)
-
-    # Start the bot
-    updater.start_polling()
-    updater.idle()
-
-# Start the Flask app for deployment
-def run_flask():
-    """Run the Flask app to deploy on Render."""
-    app.run(host="0.0.0.0", port=int(os.getenv("PORT", 5000)))
+    application.add_error_handler(error)
+
+    async def telegram_webhook(request):
+        """Feed updates POSTed by Telegram into the application's queue."""
+        data = orjson.loads(await request.body())
+        await application.update_queue.put(Update.de_json(data, application.bot))
+        return PlainTextResponse("OK")
+
+    # One server handles both the health probe and the webhook route
+    app = Starlette(routes=[Route("/", home),
+                            Route(f"/{TOKEN}", telegram_webhook, methods=["POST"])])
+
+    config = Config()
+    config.bind = [f"0.0.0.0:{PORT}"]
+
+    async with application:
+        await post_init(application)
+        # Fail fast at startup if persisted state cannot actually be written
+        # (e.g. something unpicklable leaks into the persisted data)
+        await application.update_persistence()
+        await application.start()
+        if PUBLIC_URL:
+            # Event-driven: Telegram POSTs updates, no getUpdates churn while idle
+            await application.bot.set_webhook(f"{PUBLIC_URL}/{TOKEN}",
+                                              allowed_updates=Update.ALL_TYPES)
+        else:
+            await application.updater.start_polling()
+        try:
+            await serve(app, config)
+        finally:
+            if application.updater.running:
+                await application.updater.stop()
+            await application.stop()
+            await post_shutdown(application)
 
-# Run both the Flask app and the bot in separate threads
 if __name__ == "__main__":
-    Thread(target=main).start()
-    Thread(target=run_flask).start()
+    asyncio.run(main())